@@ -1,11 +1,63 @@
+import argparse
+import gzip
+import hashlib
 import json
+import mmap
+import multiprocessing
 import os
+import random
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import httpx
+import platformdirs
 import requests
-from atproto import Client
+from atproto import Client, Request, models
+from atproto_client.models.utils import get_model_as_dict, get_or_create
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+if msgspec is not None:
+    class Image(msgspec.Struct):
+        url: str
+        alt_text: str
+
+    class Post(msgspec.Struct):
+        created_at: str
+        text: str
+        images: list[Image]
+else:
+    # Keyword construction gives the same fields as plain dicts
+    Image = Post = dict
+
+
+def make_client(base_url=None):
+    """
+    Create an atproto Client backed by a keep-alive (and, when h2 is installed,
+    HTTP/2) httpx session with bounded timeouts so a slow page cannot stall the export.
+    """
+    request = Request(
+        http2=HTTP2_AVAILABLE,
+        timeout=httpx.Timeout(30.0, connect=5.0),
+        limits=httpx.Limits(max_keepalive_connections=4),
+    )
+    return Client(base_url=base_url, request=request)
 
 def fetch_did_document(did: str, timeout: int = 10):
     """Fetch the DID document for a did:plc or did:web DID."""
@@ -27,17 +79,80 @@ def fetch_did_document(did: str, timeout: int = 10):
     except requests.exceptions.RequestException:
         return None
 
+def serialize_post(post):
+    """
+    Serialize a single post to UTF-8 JSON bytes indented as a top-level list item,
+    using msgspec (for Post structs) or orjson when available.
+    """
+    if msgspec is not None:
+        data = msgspec.json.format(msgspec.json.encode(post), indent=2)
+    elif orjson is not None:
+        data = orjson.dumps(post, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        data = json.dumps(post, indent=2, ensure_ascii=False).encode('utf-8')
+    # JSON strings never contain raw newlines, so this only re-indents structure
+    return b"  " + data.replace(b"\n", b"\n  ")
+
+def write_posts(posts, filename):
+    """
+    Stream posts to `filename` as an indented JSON list, one post at a time, so
+    the full serialized export never has to be held in memory.
+    Returns the number of bytes written.
+    """
+    with open(filename, 'wb') as f:
+        if not posts:
+            return f.write(b"[]")
+        written = f.write(b"[\n")
+        separator = b""
+        for post in posts:
+            written += f.write(separator)
+            written += f.write(serialize_post(post))
+            separator = b",\n"
+        written += f.write(b"\n]")
+    return written
+
+def read_export(filename):
+    """
+    Read an exported JSON file back as text for tokenization. The file is
+    memory-mapped and decoded in place, avoiding an intermediate bytes copy.
+    """
+    with open(filename, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return str(mm, 'utf-8')
+
+TOKEN_LIMIT = 950000  # 95% of 1M tokens
+
+_TOKENIZER = None
+TOKENIZE_SHARD_LINES = 2000  # lines of exported JSON per tokenizer batch item
+
+def _get_tokenizer():
+    """
+    Load the FLAN-T5 tokenizer once and reuse it for later calls.
+    """
+    global _TOKENIZER
+    if _TOKENIZER is None:
+        from transformers import AutoTokenizer
+        _TOKENIZER = AutoTokenizer.from_pretrained("google/flan-t5-small", use_fast=True)
+    return _TOKENIZER
+
 def count_tokens_with_google_tokenizer(text):
     """
     Count tokens using Google's FLAN-T5 tokenizer for accurate Gemini estimates.
     Returns token count or None if tokenizer unavailable.
     """
     try:
-        from transformers import AutoTokenizer
         print("🔢 Counting tokens using Google FLAN-T5 tokenizer...")
-        tokenizer = AutoTokenizer.from_pretrained("google/flan-t5-small")
-        tokens = tokenizer.encode(text, add_special_tokens=True)
-        return len(tokens)
+        tokenizer = _get_tokenizer()
+        if not getattr(tokenizer, "is_fast", False):
+            enc = tokenizer(text, add_special_tokens=True, return_attention_mask=False)
+            return len(enc["input_ids"])
+        # Shard by line blocks so the Rust backend can encode them in parallel,
+        # then add the special tokens a single sequence would have received.
+        lines = text.splitlines(keepends=True)
+        shards = ["".join(lines[i:i + TOKENIZE_SHARD_LINES])
+                  for i in range(0, len(lines), TOKENIZE_SHARD_LINES)]
+        encodings = tokenizer.backend_tokenizer.encode_batch(shards, add_special_tokens=False)
+        return sum(len(e.ids) for e in encodings) + tokenizer.num_special_tokens_to_add()
     except ImportError:
         print("⚠️  transformers not installed. Run: pip install transformers")
         return None
@@ -45,57 +160,161 @@ def count_tokens_with_google_tokenizer(text):
         print(f"⚠️  Error counting tokens: {e}")
         return None
 
-def check_token_limit_and_offer_trim(filename, all_posts, handle):
+def count_tokens_batch(texts):
     """
-    Check if the exported JSON exceeds token limits and offer to trim if needed.
+    Count tokens of each text in `texts`, encoding them as a single batch so the
+    fast tokenizer can spread the work across cores.
+    Returns a list of token counts or None if tokenizer unavailable.
     """
-    TOKEN_LIMIT = 950000  # 95% of 1M tokens
-    
-    # Read the exported file
-    with open(filename, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Count tokens
-    token_count = count_tokens_with_google_tokenizer(content)
-    
-    if token_count is None:
-        print("\n⚠️  Could not count tokens. Install transformers for token analysis.")
-        return filename
+    try:
+        print(f"🔢 Counting tokens of {len(texts):,} sampled posts...")
+        tokenizer = _get_tokenizer()
+        if not getattr(tokenizer, "is_fast", False):
+            enc = tokenizer(texts, add_special_tokens=False, return_attention_mask=False)
+            return [len(ids) for ids in enc["input_ids"]]
+        encodings = tokenizer.backend_tokenizer.encode_batch(texts, add_special_tokens=False)
+        return [len(e.ids) for e in encodings]
+    except ImportError:
+        print("⚠️  transformers not installed. Run: pip install transformers")
+        return None
+    except Exception as e:
+        print(f"⚠️  Error counting tokens: {e}")
+        return None
+
+def _count_tokens_child(conn, filename, texts):
+    try:
+        file_tokens = None
+        if filename is not None:
+            file_tokens = count_tokens_with_google_tokenizer(read_export(filename))
+        text_tokens = count_tokens_batch(texts) if texts is not None else None
+        conn.send((file_tokens, text_tokens))
+    finally:
+        conn.close()
+
+def count_tokens_in_subprocess(filename=None, texts=None):
+    """
+    Count tokens of the exported file `filename` and of each text in `texts` (see
+    count_tokens_batch) in one short-lived spawned process, so transformers and
+    the tokenizer are loaded once per export and their memory is returned to the
+    OS as soon as counting is done.
+    Returns a (file_tokens, text_tokens) tuple; either is None if it was not
+    requested or counting failed.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_count_tokens_child, args=(child_conn, filename, texts))
+    process.start()
+    child_conn.close()
+    try:
+        return parent_conn.recv()
+    except EOFError:
+        print("⚠️  Token counting process exited unexpectedly.")
+        return None, None
+    finally:
+        parent_conn.close()
+        process.join()
+
+TOKEN_SAMPLE_SIZE = 200  # posts tokenized to estimate the average tokens per post
+
+def sample_post_texts(all_posts):
+    """
+    Serialize a random sample of posts for estimating the average tokens per post.
+    """
+    sample = random.sample(all_posts, min(TOKEN_SAMPLE_SIZE, len(all_posts)))
+    return [serialize_post(post).decode('utf-8') for post in sample]
+
+def analyze_tokens(filename, export_size, all_posts, token_limit=TOKEN_LIMIT):
+    """
+    Report the token count of the export written to `filename` (`export_size`
+    bytes). Returns None if it is within `token_limit`, otherwise a
+    (posts_to_keep, avg_tokens_per_post) tuple describing the trim needed.
+    """
+    # Cheap estimate first (~4 bytes per token); clearly small exports are not
+    # tokenized at all, and only borderline ones get a full count. Anything that
+    # may need trimming also gets a sampled per-post average, in the same process.
+    approx_tokens = export_size // 4
+    token_count = approx_tokens
+    count_label = "Estimated tokens"
+    avg_tokens_per_post = None
+    if approx_tokens >= token_limit * 0.7:
+        borderline = approx_tokens <= token_limit * 1.3
+        file_tokens, sample_tokens = count_tokens_in_subprocess(
+            filename if borderline else None, sample_post_texts(all_posts))
+        if sample_tokens:
+            avg_tokens_per_post = sum(sample_tokens) / len(sample_tokens)
+        if file_tokens is not None:
+            token_count = file_tokens
+            count_label = "Total tokens"
+        elif avg_tokens_per_post is not None:
+            # Keep the total on the same (tokenizer) scale as the per-post average
+            token_count = int(avg_tokens_per_post * len(all_posts))
+            count_label = "Estimated tokens (sampled)"
+        else:
+            print("\n⚠️  Could not count tokens. Install transformers for exact token analysis.")
+            print("   Falling back to the size-based estimate.")
     
     print(f"\n📊 Token Analysis:")
-    print(f"   Total tokens: {token_count:,}")
-    print(f"   Limit (95% of 1M): {TOKEN_LIMIT:,}")
+    print(f"   {count_label}: {token_count:,}")
+    print(f"   Limit: {token_limit:,}")
     
-    if token_count <= TOKEN_LIMIT:
+    if token_count <= token_limit:
         print(f"✅ Token count is within limits! Ready for Gemini prompting.")
-        return filename
+        return None
     
-    # Calculate how many posts to remove
-    excess_tokens = token_count - TOKEN_LIMIT
-    avg_tokens_per_post = token_count // len(all_posts)
-    posts_to_remove = int(excess_tokens / avg_tokens_per_post * 1.1)  # 10% buffer
-    posts_to_keep = len(all_posts) - posts_to_remove
+    # Calculate how many posts fit, from a sampled per-post average
+    excess_tokens = token_count - token_limit
+    avg_tokens_per_post = avg_tokens_per_post or token_count / len(all_posts)
+    posts_to_keep = min(len(all_posts), int(token_limit / (avg_tokens_per_post * 1.1)))  # 10% buffer
+    posts_to_remove = len(all_posts) - posts_to_keep
     
     print(f"\n⚠️  TOKEN LIMIT EXCEEDED!")
     print(f"   Excess tokens: {excess_tokens:,}")
     print(f"   Estimated posts to remove: {posts_to_remove:,} (oldest)")
     print(f"   Posts that would remain: {posts_to_keep:,}")
     print(f"\n💡 This dataset is too large for effective Gemini prompting.")
+    return posts_to_keep, avg_tokens_per_post
+
+def check_token_limit_and_offer_trim(filename, export_size, all_posts, handle,
+                                     token_limit=TOKEN_LIMIT, trim=None):
+    """
+    Check if the exported JSON exceeds token limits and trim if needed.
+    `export_size` is the size in bytes of the export written to `filename`.
+    With trim=True/False the oldest posts are/aren't removed without asking;
+    with trim=None the user is prompted.
+    """
+    analysis = analyze_tokens(filename, export_size, all_posts, token_limit)
+    if analysis is None:
+        return filename
+    posts_to_keep, avg_tokens_per_post = analysis
+    if posts_to_keep == 0:
+        print("\n❌ Not even one post fits within the token limit; not trimming.")
+        print("📁 Keeping full export. You may need to manually trim for Gemini use.")
+        return filename
     
     # Offer to trim
-    while True:
-        choice = input("\n🤔 Remove oldest posts automatically to fit limit? (y/n): ").strip().lower()
+    while trim is None:
+        try:
+            choice = input("\n🤔 Remove oldest posts automatically to fit limit? (y/n): ").strip().lower()
+        except EOFError:
+            choice = 'n'
         if choice in ['y', 'yes']:
-            return trim_posts_and_reexport(filename, all_posts, posts_to_keep, handle)
+            trim = True
         elif choice in ['n', 'no']:
-            print("\n📁 Keeping full export. You may need to manually trim for Gemini use.")
-            return filename
+            trim = False
         else:
             print("Please enter 'y' or 'n'")
+    
+    if not trim:
+        print("\n📁 Keeping full export. You may need to manually trim for Gemini use.")
+        return filename
+    return apply_trim(filename, all_posts, posts_to_keep, handle,
+                      avg_tokens_per_post, token_limit)
 
-def trim_posts_and_reexport(original_filename, all_posts, posts_to_keep, handle):
+def apply_trim(original_filename, all_posts, posts_to_keep, handle,
+               avg_tokens_per_post, token_limit=TOKEN_LIMIT):
     """
-    Create a new trimmed export with only the newest posts.
+    Create a new trimmed export with only the newest posts. The trimmed token
+    count is estimated from `avg_tokens_per_post` rather than re-tokenized.
     """
     print(f"\n✂️  Trimming to newest {posts_to_keep:,} posts...")
     
@@ -107,25 +326,20 @@ def trim_posts_and_reexport(original_filename, all_posts, posts_to_keep, handle)
     trimmed_filename = f"{handle}_posts_{timestamp}_trimmed.json"
     
     # Write trimmed data
-    with open(trimmed_filename, 'w', encoding='utf-8') as f:
-        json.dump(trimmed_posts, f, indent=2, ensure_ascii=False)
-    
-    # Verify token count of trimmed file
-    with open(trimmed_filename, 'r', encoding='utf-8') as f:
-        trimmed_content = f.read()
+    write_posts(trimmed_posts, trimmed_filename)
     
-    trimmed_tokens = count_tokens_with_google_tokenizer(trimmed_content)
+    # Estimate token count of trimmed file
+    trimmed_tokens = int(avg_tokens_per_post * len(trimmed_posts))
     
     print(f"\n✅ Trimmed export created!")
     print(f"📁 Original: {original_filename} ({len(all_posts):,} posts)")
     print(f"📁 Trimmed: {trimmed_filename} ({len(trimmed_posts):,} posts)")
     
-    if trimmed_tokens:
-        print(f"🔢 Trimmed tokens: {trimmed_tokens:,}")
-        if trimmed_tokens <= 950000:
-            print(f"✅ Trimmed file is within token limits!")
-        else:
-            print(f"⚠️  Trimmed file may still be too large. Consider further trimming.")
+    print(f"🔢 Estimated trimmed tokens: {trimmed_tokens:,}")
+    if trimmed_tokens <= token_limit:
+        print(f"✅ Trimmed file is within token limits!")
+    else:
+        print(f"⚠️  Trimmed file may still be too large. Consider further trimming.")
     
     return trimmed_filename
 
@@ -147,12 +361,82 @@ def get_pds_endpoint_from_did_doc(did_doc: dict):
                 return endpoint.rstrip("/")  # ensure no trailing slash
     return None
 
-def export_posts_to_json(handle):
+PAGE_LIMIT = 100  # server-side maximum for listRecords
+PAGE_CACHE_DIR = os.path.join(platformdirs.user_cache_dir("bsky-to-gem"), "pages")
+PAGE_CACHE_MAX_AGE = 24 * 60 * 60  # seconds before a cached page is re-fetched
+
+def _page_cache_path(repo_did, cursor):
+    key = hashlib.blake2b(f"{repo_did}|{cursor}".encode(), digest_size=16).hexdigest()
+    return os.path.join(PAGE_CACHE_DIR, f"{key}.json.gz")
+
+def load_cached_page(repo_did, cursor):
+    """
+    Return the cached listRecords response for (repo_did, cursor), or None on a
+    miss or when the cached page is older than PAGE_CACHE_MAX_AGE.
+    """
+    try:
+        path = _page_cache_path(repo_did, cursor)
+        if time.time() - os.path.getmtime(path) > PAGE_CACHE_MAX_AGE:
+            return None
+        with gzip.open(path, 'rb') as f:
+            raw = f.read()
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        return get_or_create(data, models.ComAtprotoRepoListRecords.Response)
+    except Exception:
+        return None
+
+def save_cached_page(repo_did, cursor, response):
+    """
+    Store a listRecords response as gzipped JSON. Failures are ignored; the
+    cache is only an optimization.
+    """
+    try:
+        data = get_model_as_dict(response)
+        raw = orjson.dumps(data) if orjson is not None else json.dumps(data).encode('utf-8')
+        os.makedirs(PAGE_CACHE_DIR, exist_ok=True)
+        with gzip.open(_page_cache_path(repo_did, cursor), 'wb') as f:
+            f.write(raw)
+    except Exception:
+        pass
+
+def list_post_records(client, repo_did, cursor, use_cache=True):
+    """
+    Fetch one page of app.bsky.feed.post records starting at `cursor`.
+
+    Pages are listed oldest first so that page boundaries stay stable as new
+    posts are added; full pages therefore only change through deletions or
+    backdated posts and are cached on disk for PAGE_CACHE_MAX_AGE, so re-exports
+    mostly hit the network for the newest pages.
+    With use_cache=False the cache is not read but is still refreshed.
+    Returns a (response, from_cache) tuple.
+    """
+    if use_cache:
+        cached = load_cached_page(repo_did, cursor)
+        if cached is not None:
+            return cached, True
+
+    response = client.com.atproto.repo.list_records(
+        {
+            'repo': repo_did,
+            'collection': 'app.bsky.feed.post',
+            'limit': PAGE_LIMIT,
+            'cursor': cursor,
+            'reverse': True,
+        }
+    )
+    # A short page (the newest one) will still gain posts, so only cache full pages
+    if len(response.records) == PAGE_LIMIT and response.cursor:
+        save_cached_page(repo_did, cursor, response)
+    return response, False
+
+def export_posts_to_json(handle, refresh=False, token_limit=TOKEN_LIMIT, trim=None):
     """
     Fetches all posts from an atproto account and saves them to a timestamped JSON file.
+    Pass refresh=True to ignore previously cached pages and re-fetch everything.
+    `token_limit` and `trim` are passed to check_token_limit_and_offer_trim.
     """
     # First, use the default client to resolve the handle to a DID
-    default_client = Client()  # uses default/public host for resolution
+    default_client = make_client()  # uses default/public host for resolution
     print(f"🔍 Resolving handle: {handle}")
 
     try:
@@ -178,7 +462,7 @@ def export_posts_to_json(handle):
 
     # Use a client targeted at the account's PDS if we found one, otherwise use default client.
     if pds_endpoint:
-        client = Client(base_url=pds_endpoint)
+        client = make_client(pds_endpoint)
     else:
         client = default_client
 
@@ -186,88 +470,110 @@ def export_posts_to_json(handle):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_filename = f"{handle}_posts_{timestamp}.json"
     
-    all_posts = []
-    cursor = None
+    # Post fields are collected column-wise and only assembled into posts once
+    # the final (sorted) order is known.
+    created_ats = []
+    texts = []
+    post_images = []
     posts_fetched = 0
+    cached_pages = 0
     image_cdn_base = "https://cdn.bsky.app/img/feed_fullsize/plain"
+    image_url_prefix = f"{image_cdn_base}/{repo_did}/"
+    append_created_at = created_ats.append
+    append_text = texts.append
+    append_images = post_images.append
 
     print("Starting to fetch posts... This may take a while if you have many posts.")
 
-    while True:
-        try:
-            response = client.com.atproto.repo.list_records(
-                {
-                    'repo': repo_did,
-                    'collection': 'app.bsky.feed.post',
-                    'limit': 100,
-                    'cursor': cursor,
-                }
-            )
-
-            # If response.records is empty/falsey
-            if not getattr(response, "records", None):
-                if posts_fetched == 0:
-                    # No records found on this PDS. If we were using a fallback public client,
-                    # it may simply be pointing at the wrong PDS. Surface an actionable error.
-                    if pds_endpoint:
-                        print("No more posts found.")
-                        break
+    # Pipeline page fetches: the next request is submitted as soon as its cursor is
+    # known, so the network wait overlaps with parsing the current page. Only one
+    # request is ever in flight, so the (non thread-safe) client is never shared.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        page_cursor = None
+        pending = executor.submit(list_post_records, client, repo_did, page_cursor, not refresh)
+
+        while True:
+            try:
+                response, from_cache = pending.result()
+                cached_pages += from_cache
+
+                # If response.records is empty/falsey
+                if not getattr(response, "records", None):
+                    if posts_fetched == 0:
+                        # No records found on this PDS. If we were using a fallback public client,
+                        # it may simply be pointing at the wrong PDS. Surface an actionable error.
+                        if pds_endpoint:
+                            print("No more posts found.")
+                            break
+                        else:
+                            print("❌ No posts found at the public resolver. The account may be hosted on a different PDS.")
+                            print("💡 If this is a custom domain or migrated account, its PDS endpoint must be discovered from the DID document.")
+                            sys.exit(1)
+
+                # Prefetch the next page while this one is processed
+                cursor = getattr(response, "cursor", None)
+                if cursor:
+                    pending = executor.submit(list_post_records, client, repo_did, cursor, not refresh)
+
+                for record in response.records:
+                    value = record.value
+                    embed = getattr(value, 'embed', None)
+                    if embed is not None and getattr(embed, "py_type", "") == 'app.bsky.embed.images':
+                        images = [
+                            Image(url=image_url_prefix + str(image.image.cid) + "@jpeg", alt_text=image.alt)
+                            for image in embed.images
+                        ]
                     else:
-                        print("❌ No posts found at the public resolver. The account may be hosted on a different PDS.")
-                        print("💡 If this is a custom domain or migrated account, its PDS endpoint must be discovered from the DID document.")
-                        sys.exit(1)
-
-            for record in response.records:
-                post_data = {
-                    'created_at': record.value.created_at,
-                    'text': record.value.text,
-                    'images': []
-                }
-
-                if hasattr(record.value, 'embed') and record.value.embed:
-                    if getattr(record.value.embed, "py_type", "") == 'app.bsky.embed.images':
-                        for image in record.value.embed.images:
-                            image_url = f"{image_cdn_base}/{repo_did}/{image.image.cid}@jpeg"
-                            post_data['images'].append({
-                                'url': image_url,
-                                'alt_text': image.alt
-                            })
-
-                all_posts.append(post_data)
-
-            posts_fetched += len(response.records)
-            print(f"Fetched {posts_fetched} posts so far...")
-            
-            cursor = getattr(response, "cursor", None)
-            if not cursor:
-                print("Reached end of data.")
-                break
-
-        except Exception as e:
-            print(f"❌ Error fetching posts: {e}")
-            # If we were using a specific PDS client and it failed, try falling back to the public client once.
-            if pds_endpoint and client is not default_client:
-                print("ℹ️ Attempting fallback: switching to public resolver client and retrying once...")
-                client = default_client
-                pds_endpoint = None  # mark that we are no longer using custom PDS
-                continue
-            sys.exit(1)
-
-    if not all_posts:
+                        images = []
+
+                    append_created_at(value.created_at)
+                    append_text(value.text)
+                    append_images(images)
+
+                posts_fetched += len(response.records)
+                print(f"Fetched {posts_fetched} posts so far...")
+                
+                if not cursor:
+                    print("Reached end of data.")
+                    break
+                page_cursor = cursor
+
+            except Exception as e:
+                print(f"❌ Error fetching posts: {e}")
+                # If we were using a specific PDS client and it failed, try falling back to the public client once.
+                if pds_endpoint and client is not default_client:
+                    print("ℹ️ Attempting fallback: switching to public resolver client and retrying once...")
+                    client = default_client
+                    pds_endpoint = None  # mark that we are no longer using custom PDS
+                    pending = executor.submit(list_post_records, client, repo_did, page_cursor, not refresh)
+                    continue
+                sys.exit(1)
+
+    if cached_pages:
+        print(f"♻️  Reused {cached_pages} cached page(s) up to {PAGE_CACHE_MAX_AGE // 3600}h old. "
+              "Pass --refresh to pick up recently deleted or backdated posts.")
+
+    if not created_ats:
         print("❌ Export failed: no posts to save.")
         sys.exit(1)
 
-    all_posts.sort(key=lambda x: x['created_at'], reverse=True)
+    # listRecords pages come back in rkey order, which does not always match
+    # created_at (e.g. imported or backdated posts), so the sort is kept.
+    order = sorted(range(len(created_ats)), key=created_ats.__getitem__, reverse=True)
+    all_posts = [
+        Post(created_at=created_ats[i], text=texts[i], images=post_images[i])
+        for i in order
+    ]
 
-    with open(output_filename, 'w', encoding='utf-8') as f:
-        json.dump(all_posts, f, indent=2, ensure_ascii=False)
+    export_size = write_posts(all_posts, output_filename)
 
     print(f"\n✅ Export complete!")
     print(f"📊 Total posts exported: {len(all_posts)}")
     print(f"💾 Export saved to: {output_filename}")
     
     # Check token limits and offer trimming if needed
-    final_filename = check_token_limit_and_offer_trim(output_filename, all_posts, handle)
+    final_filename = check_token_limit_and_offer_trim(output_filename, export_size, all_posts, handle,
+                                                      token_limit, trim)
     
     if final_filename != output_filename:
         print(f"\n🎯 Use this file for Gemini prompting: {final_filename}")
@@ -278,17 +584,29 @@ def export_posts_to_json(handle):
 
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("🦋 Bluesky Posts Export Tool")
-        print("=" * 40)
-        print("Usage: python export_posts.py <handle>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="🦋 Bluesky Posts Export Tool")
+    parser.add_argument("handle", help="account handle, e.g. user.bsky.social")
+    parser.add_argument("--refresh", action="store_true",
+                        help="ignore cached pages and re-fetch every post")
+    parser.add_argument("--token-limit", type=int, default=TOKEN_LIMIT,
+                        help=f"token limit for the export (default: {TOKEN_LIMIT:,})")
+    trim_group = parser.add_mutually_exclusive_group()
+    trim_group.add_argument("-y", "--auto-trim", dest="trim", action="store_true", default=None,
+                            help="remove the oldest posts without asking if over the limit")
+    trim_group.add_argument("--no-trim", dest="trim", action="store_false",
+                            help="keep the full export without asking if over the limit")
+    args = parser.parse_args()
+    if args.token_limit <= 0:
+        parser.error("--token-limit must be a positive number of tokens")
+    # Flush each line so progress shows up promptly when output is piped
+    sys.stdout.reconfigure(line_buffering=True)
     
-    handle = sys.argv[1]
+    handle = args.handle
     print(f"🎯 Target account: {handle}")
     print(f"📥 Starting full export (no authentication)...")
 
-    final_file = export_posts_to_json(handle)
+    final_file = export_posts_to_json(handle, refresh=args.refresh,
+                                      token_limit=args.token_limit, trim=args.trim)
     
     if final_file:
         print(f"\n🚀 Ready to use with Gemini!")